@@ -4,7 +4,11 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import yfinance as yf
 import numpy as np
+from tsdownsample import MinMaxLTTBDownsampler
 from datetime import datetime, timedelta
+from types import MappingProxyType
+
+from utils.indicators import INDICATORS, advance_state, initial_state
 
 # Configure page
 st.set_page_config(
@@ -13,80 +17,84 @@ st.set_page_config(
     layout="wide"
 )
 
-def calculate_rsi(prices, window=14):
-    """Calculate RSI"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+# Yahoo Finance tickers keyed by the labels offered in the sidebar.
+# Read-only so the sidebar options and the fetch lookups can't drift apart.
+_FOREX_MAP = MappingProxyType({
+    "EUR/USD": "EURUSD=X",
+    "GBP/USD": "GBPUSD=X",
+    "USD/JPY": "USDJPY=X",
+    "AUD/USD": "AUDUSD=X",
+    "USD/CAD": "USDCAD=X"
+})
+
+_CRYPTO_MAP = MappingProxyType({
+    "BTC": "BTC-USD",
+    "ETH": "ETH-USD",
+    "ADA": "ADA-USD",
+    "DOT": "DOT-USD",
+    "LINK": "LINK-USD"
+})
+
+# FX and crypto bars have no corporate actions to adjust for, and only
+# regular-session bars are charted
+_DOWNLOAD_OPTIONS = dict(actions=False, auto_adjust=False, prepost=False)
 
-def calculate_macd(prices, fast=12, slow=26, signal=9):
-    """Calculate MACD"""
-    ema_fast = prices.ewm(span=fast).mean()
-    ema_slow = prices.ewm(span=slow).mean()
-    macd = ema_fast - ema_slow
-    signal_line = macd.ewm(span=signal).mean()
-    histogram = macd - signal_line
-    return macd, signal_line, histogram
+def _clean_ohlc(df):
+    """Lower-case Yahoo Finance columns and keep only complete OHLC bars"""
+    # yf.download returns intraday bars on a UTC index (Ticker.history used the
+    # exchange timezone), so the chart's time axis is in UTC
+    # Select only the columns we need; a NaN bar would poison the recursive EMAs
+    df = df[['Open', 'High', 'Low', 'Close']].dropna()
+    df.columns = df.columns.str.lower()
+    return df
 
-def calculate_bollinger_bands(prices, window=20, num_std=2):
-    """Calculate Bollinger Bands"""
-    rolling_mean = prices.rolling(window=window).mean()
-    rolling_std = prices.rolling(window=window).std()
-    upper_band = rolling_mean + (rolling_std * num_std)
-    lower_band = rolling_mean - (rolling_std * num_std)
-    return upper_band, rolling_mean, lower_band
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_batch(symbols: tuple, period: str, interval: str) -> dict[str, pd.DataFrame]:
+    """Download OHLC bars for several tickers in one call (cached for 60 seconds)"""
+    raw = yf.download(" ".join(symbols), period=period, interval=interval,
+                      group_by='ticker', threads=True, progress=False, **_DOWNLOAD_OPTIONS)
+    
+    # yfinance keeps an all-NaN block for tickers it failed to fetch, which
+    # _clean_ohlc's dropna() turns into an empty frame
+    return {yf_symbol: _clean_ohlc(raw[yf_symbol]) for yf_symbol in symbols}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_since(yf_symbol: str, start: pd.Timestamp, interval: str) -> pd.DataFrame:
+    """Download one ticker's OHLC bars from start onwards (cached for 60 seconds)"""
+    raw = yf.download(yf_symbol, start=start, interval=interval,
+                      group_by='ticker', progress=False, **_DOWNLOAD_OPTIONS)
+    return _clean_ohlc(raw[yf_symbol])
 
-def get_market_data(symbol, market_type="forex"):
-    """Get market data from Yahoo Finance"""
+def get_market_data(symbol, market_type="forex", since=None):
+    """Get market data from Yahoo Finance, optionally only the bars from since onwards"""
     try:
         if market_type == "forex":
-            # Forex symbols
-            symbol_map = {
-                "EUR/USD": "EURUSD=X",
-                "GBP/USD": "GBPUSD=X", 
-                "USD/JPY": "USDJPY=X",
-                "AUD/USD": "AUDUSD=X",
-                "USD/CAD": "USDCAD=X"
-            }
-            yf_symbol = symbol_map.get(symbol, f"{symbol.replace('/', '')}=X")
+            mapping = _FOREX_MAP
+            fallback = f"{symbol.replace('/', '')}=X"
         else:
-            # Crypto symbols
-            symbol_map = {
-                "BTC": "BTC-USD",
-                "ETH": "ETH-USD",
-                "ADA": "ADA-USD", 
-                "DOT": "DOT-USD",
-                "LINK": "LINK-USD"
-            }
-            yf_symbol = symbol_map.get(symbol, f"{symbol}-USD")
-        
-        st.info(f"📊 Fetching {yf_symbol} data...")
+            mapping = _CRYPTO_MAP
+            fallback = f"{symbol}-USD"
         
-        ticker = yf.Ticker(yf_symbol)
-        df = ticker.history(period="5d", interval="15m")
+        yf_symbol = mapping.get(symbol, fallback)
         
-        if df.empty:
-            st.error(f"❌ No data found for {symbol}")
-            return None
+        # Fetch the whole market's symbol list at once so switching pairs
+        # afterwards is served from the cache
+        watchlist = tuple(mapping.values())
+        if yf_symbol not in watchlist:
+            watchlist += (yf_symbol,)
         
-        # Rename columns properly
-        column_mapping = {
-            'Open': 'open',
-            'High': 'high', 
-            'Low': 'low',
-            'Close': 'close',
-            'Volume': 'volume'
-        }
+        st.info(f"📊 Fetching {yf_symbol} data...")
         
-        for old_col, new_col in column_mapping.items():
-            if old_col in df.columns:
-                df = df.rename(columns={old_col: new_col})
+        if since is None:
+            df = _fetch_batch(watchlist, "5d", "15m").get(yf_symbol)
+        else:
+            df = _fetch_since(yf_symbol, since, "15m")
         
-        # Select only the columns we need
-        df = df[['open', 'high', 'low', 'close']]
+        if df is None or df.empty:
+            # Nothing new since the last refresh isn't an error
+            if since is None:
+                st.error(f"❌ No data found for {symbol}")
+            return None
         
         st.success(f"✅ Successfully fetched {len(df)} data points")
         return df
@@ -95,38 +103,85 @@ def get_market_data(symbol, market_type="forex"):
         st.error(f"❌ Error fetching data: {str(e)}")
         return None
 
+def _frame_key(df):
+    """Cache key for a price frame, avoiding Streamlit's full DataFrame hash"""
+    # The last bar is still forming when fetched, so its close is part of the key
+    return len(df), df.index[-1].value, df['close'].iat[-1]
+
+_FRAME_HASH_FUNCS = {pd.DataFrame: _frame_key}
+
 def generate_signals(df):
     """Generate trading signals"""
     if df is None or len(df) < 20:
         return None
     
-    # Calculate indicators
-    df['rsi'] = calculate_rsi(df['close'])
-    df['macd'], df['macd_signal'], df['macd_hist'] = calculate_macd(df['close'])
-    df['bb_upper'], df['bb_middle'], df['bb_lower'] = calculate_bollinger_bands(df['close'])
-    df['sma_20'] = df['close'].rolling(window=20).mean()
-    df['sma_50'] = df['close'].rolling(window=50).mean()
+    # Indicators stay as arrays; inserting them as columns would copy the
+    # frame. The price frame itself keeps float64 so the displayed quotes
+    # are exact.
+    indicators, state = advance_state(initial_state(), df['close'].to_numpy())
+    return _evaluate_signals(df, indicators, state)
+
+def update_signals(previous, new_bars):
+    """Advance a previous signals result through new bars, keeping its length"""
+    # The previous last bar was still forming, so it is re-fed from new_bars
+    df = previous['data']
+    new_bars = pd.concat([df.iloc[-1:], new_bars[new_bars.index >= df.index[-1]]])
+    new_bars = new_bars[~new_bars.index.duplicated(keep='last')]
+    
+    new_indicators, state = advance_state(previous['state'], new_bars['close'].to_numpy())
+    
+    keep = len(df)
+    df = pd.concat([df.iloc[:-1], new_bars]).iloc[-keep:]
+    indicators = {
+        name: np.concatenate([previous['indicators'][name][:-1], new_indicators[name]])[-keep:]
+        for name in INDICATORS
+    }
+    indicators['sma_20'] = indicators['bb_middle']
+    return _evaluate_signals(df, indicators, state)
+
+def _evaluate_signals(df, indicators, state):
+    """Turn indicator arrays into the current signals"""
+    close = df['close'].to_numpy(np.float32)
+    rsi = indicators['rsi']
+    macd = indicators['macd']
+    macd_signal = indicators['macd_signal']
+    bb_upper = indicators['bb_upper']
+    bb_lower = indicators['bb_lower']
+    
+    # Crossover and band-breach flags for every bar; the current signals
+    # read the last one
+    macd_above = macd > macd_signal
+    macd_below = macd < macd_signal
+    bullish_cross = np.zeros(len(close), dtype=bool)
+    bullish_cross[1:] = macd_above[1:] & ~macd_above[:-1]
+    bearish_cross = np.zeros(len(close), dtype=bool)
+    bearish_cross[1:] = macd_below[1:] & ~macd_below[:-1]
+    flags = {
+        'bullish_cross': bullish_cross,
+        'bearish_cross': bearish_cross,
+        'below_bb_lower': close < bb_lower,
+        'above_bb_upper': close > bb_upper
+    }
     
     # Generate signals
     signals = []
     
     # RSI signals
-    if df['rsi'].iloc[-1] < 30:
+    if rsi[-1] < 30:
         signals.append(("RSI", "BUY", "Oversold", 0.7))
-    elif df['rsi'].iloc[-1] > 70:
+    elif rsi[-1] > 70:
         signals.append(("RSI", "SELL", "Overbought", 0.7))
     
     # MACD signals
-    if len(df) > 1:
-        if df['macd'].iloc[-1] > df['macd_signal'].iloc[-1] and df['macd'].iloc[-2] <= df['macd_signal'].iloc[-2]:
-            signals.append(("MACD", "BUY", "Bullish Crossover", 0.8))
-        elif df['macd'].iloc[-1] < df['macd_signal'].iloc[-1] and df['macd'].iloc[-2] >= df['macd_signal'].iloc[-2]:
-            signals.append(("MACD", "SELL", "Bearish Crossover", 0.8))
+    if flags['bullish_cross'][-1]:
+        signals.append(("MACD", "BUY", "Bullish Crossover", 0.8))
+    elif flags['bearish_cross'][-1]:
+        signals.append(("MACD", "SELL", "Bearish Crossover", 0.8))
     
     # Bollinger Bands signals
-    if df['close'].iloc[-1] < df['bb_lower'].iloc[-1]:
+    if flags['below_bb_lower'][-1]:
         signals.append(("BB", "BUY", "Below Lower Band", 0.6))
-    elif df['close'].iloc[-1] > df['bb_upper'].iloc[-1]:
+    elif flags['above_bb_upper'][-1]:
         signals.append(("BB", "SELL", "Above Upper Band", 0.6))
     
     # Calculate overall signal
@@ -147,11 +202,47 @@ def generate_signals(df):
         'overall': overall_signal,
         'buy_strength': buy_strength,
         'sell_strength': sell_strength,
-        'data': df
+        'data': df,
+        'indicators': indicators,
+        'flags': flags,
+        'state': state
     }
 
-def create_chart(df, signals_data):
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=_FRAME_HASH_FUNCS)
+def _cached_signals(symbol, df):
+    """generate_signals cached per symbol, since pairs can share a bar clock"""
+    return generate_signals(df)
+
+def get_signals(symbol, market_type="forex"):
+    """Generate signals for symbol, updating this session's last result incrementally"""
+    state_key = f"signals_{market_type}_{symbol}"
+    previous = st.session_state.get(state_key)
+    
+    if previous is None:
+        signals_data = _cached_signals(symbol, get_market_data(symbol, market_type))
+    else:
+        new_bars = get_market_data(symbol, market_type, since=previous['data'].index[-1])
+        signals_data = previous if new_bars is None else update_signals(previous, new_bars)
+    
+    if signals_data is not None:
+        st.session_state[state_key] = signals_data
+    return signals_data
+
+# Points kept per line overlay on long histories
+_MAX_LINE_POINTS = 1000
+_DOWNSAMPLER = MinMaxLTTBDownsampler()
+
+def _line_trace(df, values, **kwargs):
+    """Scattergl trace of values over df.index, downsampled past _MAX_LINE_POINTS"""
+    keep = np.flatnonzero(~np.isnan(values))
+    if len(keep) > _MAX_LINE_POINTS:
+        keep = keep[_DOWNSAMPLER.downsample(df.index.asi8[keep], values[keep], n_out=_MAX_LINE_POINTS)]
+    return go.Scattergl(x=df.index[keep], y=values[keep], **kwargs)
+
+def create_chart(df, indicators):
     """Create trading chart"""
+    # Only the line overlays are capped at _MAX_LINE_POINTS; the candlestick
+    # and the MACD histogram still carry every bar
     fig = make_subplots(
         rows=3, cols=1,
         shared_xaxes=True,
@@ -160,37 +251,39 @@ def create_chart(df, signals_data):
         subplot_titles=('Price & Indicators', 'RSI', 'MACD')
     )
     
-    # Candlestick chart
+    # Candlestick chart, fed from one packed buffer instead of four Series.
+    # Kept float64 so hover quotes match the exact prices shown below.
+    ohlc = df[['open', 'high', 'low', 'close']].to_numpy(np.float64)
     fig.add_trace(
         go.Candlestick(
             x=df.index,
-            open=df['open'],
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
+            open=ohlc[:, 0],
+            high=ohlc[:, 1],
+            low=ohlc[:, 2],
+            close=ohlc[:, 3],
             name='Price'
         ),
         row=1, col=1
     )
     
     # Bollinger Bands
-    fig.add_trace(go.Scatter(x=df.index, y=df['bb_upper'], line=dict(color='gray', dash='dash'), name='BB Upper'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=df.index, y=df['bb_middle'], line=dict(color='blue'), name='BB Middle'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=df.index, y=df['bb_lower'], line=dict(color='gray', dash='dash'), name='BB Lower'), row=1, col=1)
+    fig.add_trace(_line_trace(df, indicators['bb_upper'], line=dict(color='gray', dash='dash'), name='BB Upper'), row=1, col=1)
+    fig.add_trace(_line_trace(df, indicators['bb_middle'], line=dict(color='blue'), name='BB Middle'), row=1, col=1)
+    fig.add_trace(_line_trace(df, indicators['bb_lower'], line=dict(color='gray', dash='dash'), name='BB Lower'), row=1, col=1)
     
     # Moving averages
-    fig.add_trace(go.Scatter(x=df.index, y=df['sma_20'], line=dict(color='orange'), name='SMA 20'), row=1, col=1)
-    fig.add_trace(go.Scatter(x=df.index, y=df['sma_50'], line=dict(color='red'), name='SMA 50'), row=1, col=1)
+    fig.add_trace(_line_trace(df, indicators['sma_20'], line=dict(color='orange'), name='SMA 20'), row=1, col=1)
+    fig.add_trace(_line_trace(df, indicators['sma_50'], line=dict(color='red'), name='SMA 50'), row=1, col=1)
     
     # RSI
-    fig.add_trace(go.Scatter(x=df.index, y=df['rsi'], line=dict(color='purple'), name='RSI'), row=2, col=1)
+    fig.add_trace(_line_trace(df, indicators['rsi'], line=dict(color='purple'), name='RSI'), row=2, col=1)
     fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
     fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
     
     # MACD
-    fig.add_trace(go.Scatter(x=df.index, y=df['macd'], line=dict(color='blue'), name='MACD'), row=3, col=1)
-    fig.add_trace(go.Scatter(x=df.index, y=df['macd_signal'], line=dict(color='red'), name='Signal'), row=3, col=1)
-    fig.add_trace(go.Bar(x=df.index, y=df['macd_hist'], name='Histogram'), row=3, col=1)
+    fig.add_trace(_line_trace(df, indicators['macd'], line=dict(color='blue'), name='MACD'), row=3, col=1)
+    fig.add_trace(_line_trace(df, indicators['macd_signal'], line=dict(color='red'), name='Signal'), row=3, col=1)
+    fig.add_trace(go.Bar(x=df.index, y=indicators['macd_hist'], name='Histogram'), row=3, col=1)
     
     fig.update_layout(
         title="Trading Analysis Dashboard",
@@ -200,6 +293,11 @@ def create_chart(df, signals_data):
     
     return fig
 
+@st.cache_data(max_entries=64, show_spinner=False, hash_funcs=_FRAME_HASH_FUNCS)
+def _build_chart_json(symbol, df, _indicators):
+    """Build the chart once per symbol and price frame and cache it as a dict"""
+    return create_chart(df, _indicators).to_dict()
+
 # Main app
 def main():
     st.title("🤖 AI Trading Signal Generator")
@@ -211,11 +309,9 @@ def main():
     market_type = st.sidebar.selectbox("Market Type", ["Forex", "Crypto"])
     
     if market_type == "Forex":
-        symbol = st.sidebar.selectbox("Currency Pair", 
-                                     ["EUR/USD", "GBP/USD", "USD/JPY", "AUD/USD", "USD/CAD"])
+        symbol = st.sidebar.selectbox("Currency Pair", tuple(_FOREX_MAP))
     else:
-        symbol = st.sidebar.selectbox("Cryptocurrency", 
-                                     ["BTC", "ETH", "ADA", "DOT", "LINK"])
+        symbol = st.sidebar.selectbox("Cryptocurrency", tuple(_CRYPTO_MAP))
     
     # Test data source
     if st.sidebar.button("🔑 Test Data Source"):
@@ -233,64 +329,63 @@ def main():
     # Generate signals
     if st.sidebar.button("Generate Signals"):
         with st.spinner("Fetching market data..."):
-            df = get_market_data(symbol, market_type.lower())
+            signals_data = get_signals(symbol, market_type.lower())
             
-            if df is not None:
-                signals_data = generate_signals(df)
+            if signals_data:
+                df = signals_data['data']
                 
-                if signals_data:
-                    # Display signals
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        signal_color = {"BUY": "🟢", "SELL": "🔴", "NEUTRAL": "🟡"}[signals_data['overall']]
-                        st.metric("Overall Signal", f"{signal_color} {signals_data['overall']}")
-                    
-                    with col2:
-                        st.metric("Buy Strength", f"{signals_data['buy_strength']:.2f}")
-                    
-                    with col3:
-                        st.metric("Sell Strength", f"{signals_data['sell_strength']:.2f}")
-                    
-                    # Display individual signals
-                    st.subheader("📊 Signal Details")
-                    for indicator, signal, reason, strength in signals_data['signals']:
-                        emoji = "🟢" if signal == "BUY" else "🔴"
-                        st.write(f"{emoji} **{indicator}**: {signal} - {reason} (Strength: {strength:.1f})")
-                    
-                    # Display chart
-                    st.subheader("📈 Technical Analysis Chart")
-                    chart = create_chart(signals_data['data'], signals_data)
-                    st.plotly_chart(chart, use_container_width=True)
-                    
-                    # Current price info
-                    current_price = df['close'].iloc[-1]
-                    price_change = df['close'].iloc[-1] - df['close'].iloc[-2]
-                    price_change_pct = (price_change / df['close'].iloc[-2]) * 100
-                    
-                    st.subheader("💰 Current Market Data")
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.metric("Price", f"{current_price:.5f}")
-                    with col2:
-                        st.metric("Change", f"{price_change:.5f}", f"{price_change_pct:.2f}%")
-                    with col3:
-                        st.metric("RSI", f"{signals_data['data']['rsi'].iloc[-1]:.1f}")
+                # Display signals
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    signal_color = {"BUY": "🟢", "SELL": "🔴", "NEUTRAL": "🟡"}[signals_data['overall']]
+                    st.metric("Overall Signal", f"{signal_color} {signals_data['overall']}")
+                
+                with col2:
+                    st.metric("Buy Strength", f"{signals_data['buy_strength']:.2f}")
+                
+                with col3:
+                    st.metric("Sell Strength", f"{signals_data['sell_strength']:.2f}")
+                
+                # Display individual signals
+                st.subheader("📊 Signal Details")
+                for indicator, signal, reason, strength in signals_data['signals']:
+                    emoji = "🟢" if signal == "BUY" else "🔴"
+                    st.write(f"{emoji} **{indicator}**: {signal} - {reason} (Strength: {strength:.1f})")
+                
+                # Display chart
+                st.subheader("📈 Technical Analysis Chart")
+                chart = go.Figure(_build_chart_json(symbol, df, signals_data['indicators']))
+                st.plotly_chart(chart, use_container_width=True)
+                
+                # Current price info
+                previous_price, current_price = df['close'].tail(2).to_numpy()
+                price_change = current_price - previous_price
+                price_change_pct = (price_change / previous_price) * 100
+                
+                st.subheader("💰 Current Market Data")
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.metric("Price", f"{current_price:.5f}")
+                with col2:
+                    st.metric("Change", f"{price_change:.5f}", f"{price_change_pct:.2f}%")
+                with col3:
+                    st.metric("RSI", f"{signals_data['indicators']['rsi'][-1]:.1f}")
+                
+                # Risk management
+                st.subheader("⚠️ Risk Management")
+                if signals_data['overall'] != "NEUTRAL":
+                    st.info(f"""
+                    **Suggested Action**: {signals_data['overall']}
                     
-                    # Risk management
-                    st.subheader("⚠️ Risk Management")
-                    if signals_data['overall'] != "NEUTRAL":
-                        st.info(f"""
-                        **Suggested Action**: {signals_data['overall']}
-                        
-                        **Entry Strategy**: Wait for confirmation on next candle
-                        **Stop Loss**: Set 1-2% below/above entry point  
-                        **Take Profit**: Target 2-3% gain for favorable risk/reward ratio
-                        **Position Size**: Risk no more than 1-2% of portfolio
-                        """)
-                    else:
-                        st.warning("Mixed signals detected. Consider waiting for clearer market direction.")
+                    **Entry Strategy**: Wait for confirmation on next candle
+                    **Stop Loss**: Set 1-2% below/above entry point  
+                    **Take Profit**: Target 2-3% gain for favorable risk/reward ratio
+                    **Position Size**: Risk no more than 1-2% of portfolio
+                    """)
+                else:
+                    st.warning("Mixed signals detected. Consider waiting for clearer market direction.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
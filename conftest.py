@@ -0,0 +1 @@
+# Lets the tests import app and utils from the repository root
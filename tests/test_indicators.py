@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from utils.indicators import advance_state, initial_state
+
+
+def make_frame(base=1.08, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = base * (1 + np.cumsum(rng.standard_normal(n)) * 1e-3)
+    index = pd.date_range("2026-10-01", periods=n, freq="15min", tz="UTC")
+    return pd.DataFrame({"open": close, "high": close * 1.001, "low": close * 0.999, "close": close}, index=index)
+
+
+def wilder_rsi(close, window=14):
+    delta = np.diff(close)
+    gain, loss = np.maximum(delta, 0), np.maximum(-delta, 0)
+    avg_gain, avg_loss = gain[:window].mean(), loss[:window].mean()
+    rsi = [100 - 100 / (1 + avg_gain / avg_loss)]
+    for g, l in zip(gain[window:], loss[window:]):
+        avg_gain = (avg_gain * (window - 1) + g) / window
+        avg_loss = (avg_loss * (window - 1) + l) / window
+        rsi.append(100 - 100 / (1 + avg_gain / avg_loss))
+    return np.concatenate([np.full(window, np.nan), rsi])
+
+
+def assert_same_indicators(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_array_equal(actual[name], expected[name], err_msg=name)
+
+
+@pytest.mark.parametrize("base", [1.08, 60000.0])
+def test_matches_pandas_references(base):
+    close = make_frame(base)["close"]
+    indicators, _ = advance_state(initial_state(), close.to_numpy())
+
+    ema_fast = close.ewm(span=12, adjust=False).mean()
+    ema_slow = close.ewm(span=26, adjust=False).mean()
+    macd = ema_fast - ema_slow
+    macd_signal = macd.ewm(span=9, adjust=False).mean()
+    sma_20 = close.rolling(20).mean()
+    std_20 = close.rolling(20).std()
+    expected = {
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "macd_hist": macd - macd_signal,
+        "bb_upper": sma_20 + 2 * std_20,
+        "bb_middle": sma_20,
+        "bb_lower": sma_20 - 2 * std_20,
+        "sma_20": sma_20,
+        "sma_50": close.rolling(50).mean(),
+    }
+    for name, values in expected.items():
+        values = values.to_numpy()
+        np.testing.assert_array_equal(np.isnan(indicators[name]), np.isnan(values), err_msg=name)
+        np.testing.assert_allclose(indicators[name], values, rtol=0, atol=1e-6 * base, err_msg=name)
+
+    np.testing.assert_allclose(indicators["rsi"], wilder_rsi(close.to_numpy()), atol=1e-3)
+
+
+def test_split_run_matches_single_run():
+    close = make_frame()["close"].to_numpy()
+    full, full_state = advance_state(initial_state(), close)
+
+    # The returned state stops before the last close, so feeding from it
+    # re-feeds that still-forming bar
+    head, state = advance_state(initial_state(), close[:120])
+    tail, tail_state = advance_state(state, close[119:])
+
+    joined = {name: np.concatenate([head[name][:-1], tail[name]]) for name in full}
+    assert_same_indicators(joined, full)
+    for resumed, expected in zip(tail_state, full_state):
+        np.testing.assert_array_equal(resumed, expected)
+
+
+def test_advance_state_leaves_input_state_untouched():
+    close = make_frame()["close"].to_numpy()
+    _, state = advance_state(initial_state(), close[:100])
+    before = tuple(part.copy() for part in state)
+    advance_state(state, close[99:])
+    for part, saved in zip(state, before):
+        np.testing.assert_array_equal(part, saved)
+
+
+def test_update_signals_refeeds_revised_last_bar():
+    full = make_frame(n=320)
+    stale = full.iloc[:300].copy()
+    stale.iloc[-1, stale.columns.get_loc("close")] *= 1.01  # bar still forming when fetched
+    previous = app.generate_signals(stale)
+
+    # The refresh repeats the previous last timestamp with its final close,
+    # overlaps a few older bars, and adds new ones
+    updated = app.update_signals(previous, full.iloc[295:310])
+    expected = app.generate_signals(full.iloc[:310])
+
+    assert len(updated["data"]) == len(stale)
+    assert not updated["data"].index.has_duplicates
+    assert updated["data"].index.equals(full.index[10:310])
+    assert updated["data"]["close"].iat[-11] == full["close"].iat[299]
+    assert_same_indicators(updated["indicators"], {name: values[10:] for name, values in expected["indicators"].items()})
+    assert updated["signals"] == expected["signals"]
+    assert updated["overall"] == expected["overall"]
+
+
+def test_update_signals_without_overlap():
+    full = make_frame(n=320)
+    previous = app.generate_signals(full.iloc[:300])
+
+    updated = app.update_signals(previous, full.iloc[300:305])
+    expected = app.generate_signals(full.iloc[:305])
+
+    assert updated["data"].index.equals(full.index[5:305])
+    assert_same_indicators(updated["indicators"], {name: values[5:] for name, values in expected["indicators"].items()})
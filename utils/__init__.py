@@ -0,0 +1,3 @@
+from utils._njit import njit
+
+__all__ = ["njit"]
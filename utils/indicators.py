@@ -0,0 +1,164 @@
+"""Single-pass technical indicator kernel with resumable state"""
+
+import numpy as np
+
+from utils._njit import njit
+
+# Indicator periods
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_NUM_STD = 20, 2
+SMA_LONG_WINDOW = 50
+
+# Layout of the running state carried between kernel calls. The kernel
+# also keeps the last SMA_LONG_WINDOW closes in a ring buffer, which
+# covers the shorter Bollinger window too.
+(_BARS_SEEN, _PREV_CLOSE, _EMA_FAST, _EMA_SLOW, _EMA_SIGNAL, _AVG_GAIN, _AVG_LOSS,
+ _SHIFT, _BB_SUM, _BB_SUMSQ, _SMA_LONG_SUM, _STATE_SIZE) = range(12)
+
+# (running scalars, ring buffer of recent closes)
+State = tuple[np.ndarray, np.ndarray]
+
+# Kernel outputs; sma_20 is not among them because it is the Bollinger
+# middle band
+INDICATORS = ('rsi', 'macd', 'macd_signal', 'macd_hist', 'bb_upper', 'bb_middle', 'bb_lower', 'sma_50')
+
+# Explicit signatures compile the kernel eagerly when this module is first
+# imported (or load it from numba's on-disk cache), so the first click in
+# the app doesn't wait on the JIT. Streamlit re-executes app.py on every
+# rerun, which is why the kernel lives here rather than in the script.
+@njit("void(float32[::1], float64[::1], float64[::1], "
+      "float32[::1], float32[::1], float32[::1], float32[::1], "
+      "float32[::1], float32[::1], float32[::1], float32[::1])", cache=True)
+def _compute_all(close, state, ring, out_rsi, out_macd, out_sig, out_hist,
+                 out_bbu, out_bbm, out_bbl, out_sma50):
+    """Advance RSI, MACD, Bollinger Bands and SMAs through close in one pass
+
+    state and ring hold the recurrences after the bars seen so far and are
+    updated in place, so a later call can carry on with the next closes.
+    """
+    alpha_fast = 2.0 / (MACD_FAST + 1)
+    alpha_slow = 2.0 / (MACD_SLOW + 1)
+    alpha_signal = 2.0 / (MACD_SIGNAL + 1)
+    
+    # Arrays may be float32 but the running state is accumulated in float64
+    bars_seen = int(state[_BARS_SEEN])
+    prev_close = state[_PREV_CLOSE]
+    ema_fast = state[_EMA_FAST]
+    ema_slow = state[_EMA_SLOW]
+    ema_signal = state[_EMA_SIGNAL]
+    avg_gain = state[_AVG_GAIN]
+    avg_loss = state[_AVG_LOSS]
+    shift = state[_SHIFT]
+    bb_sum = state[_BB_SUM]
+    bb_sumsq = state[_BB_SUMSQ]
+    sma_long_sum = state[_SMA_LONG_SUM]
+    
+    for j in range(close.shape[0]):
+        x = float(close[j])
+        i = bars_seen
+        
+        if i == 0:
+            # EMAs start at the first close, so the first MACD value is zero.
+            # Rolling sums are taken relative to it to keep the variance well
+            # conditioned.
+            ema_fast = x
+            ema_slow = x
+            ema_signal = 0.0
+            shift = x
+        
+        # MACD. The EMAs use the recursive form, equivalent to pandas'
+        # ewm(span=..., adjust=False).mean()
+        ema_fast += alpha_fast * (x - ema_fast)
+        ema_slow += alpha_slow * (x - ema_slow)
+        macd = ema_fast - ema_slow
+        ema_signal += alpha_signal * (macd - ema_signal)
+        out_macd[j] = macd
+        out_sig[j] = ema_signal
+        out_hist[j] = macd - ema_signal
+        
+        # RSI, seeded with the simple average of the first window of changes
+        out_rsi[j] = np.nan
+        if i > 0:
+            delta = x - prev_close
+            gain = max(delta, 0.0)
+            loss = max(-delta, 0.0)
+            if i <= RSI_WINDOW:
+                avg_gain += gain / RSI_WINDOW
+                avg_loss += loss / RSI_WINDOW
+            else:
+                avg_gain = (avg_gain * (RSI_WINDOW - 1) + gain) / RSI_WINDOW
+                avg_loss = (avg_loss * (RSI_WINDOW - 1) + loss) / RSI_WINDOW
+            if i >= RSI_WINDOW:
+                if avg_loss > 0.0:
+                    out_rsi[j] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+                elif avg_gain > 0.0:
+                    out_rsi[j] = 100.0
+        
+        # Bollinger Bands
+        d = x - shift
+        bb_sum += d
+        bb_sumsq += d * d
+        if i >= BB_WINDOW:
+            old = ring[(i - BB_WINDOW) % SMA_LONG_WINDOW] - shift
+            bb_sum -= old
+            bb_sumsq -= old * old
+        if i >= BB_WINDOW - 1:
+            mean = bb_sum / BB_WINDOW
+            std = np.sqrt(max((bb_sumsq - bb_sum * mean) / (BB_WINDOW - 1), 0.0))
+            out_bbm[j] = shift + mean
+            out_bbu[j] = shift + mean + BB_NUM_STD * std
+            out_bbl[j] = shift + mean - BB_NUM_STD * std
+        else:
+            out_bbm[j] = np.nan
+            out_bbu[j] = np.nan
+            out_bbl[j] = np.nan
+        
+        # SMA 50
+        sma_long_sum += d
+        if i >= SMA_LONG_WINDOW:
+            sma_long_sum -= ring[i % SMA_LONG_WINDOW] - shift
+        if i >= SMA_LONG_WINDOW - 1:
+            out_sma50[j] = shift + sma_long_sum / SMA_LONG_WINDOW
+        else:
+            out_sma50[j] = np.nan
+        
+        ring[i % SMA_LONG_WINDOW] = x
+        prev_close = x
+        bars_seen += 1
+    
+    state[_BARS_SEEN] = bars_seen
+    state[_PREV_CLOSE] = prev_close
+    state[_EMA_FAST] = ema_fast
+    state[_EMA_SLOW] = ema_slow
+    state[_EMA_SIGNAL] = ema_signal
+    state[_AVG_GAIN] = avg_gain
+    state[_AVG_LOSS] = avg_loss
+    state[_SHIFT] = shift
+    state[_BB_SUM] = bb_sum
+    state[_BB_SUMSQ] = bb_sumsq
+    state[_SMA_LONG_SUM] = sma_long_sum
+
+def initial_state() -> State:
+    """Indicator state before any bars have been seen"""
+    return np.zeros(_STATE_SIZE), np.zeros(SMA_LONG_WINDOW)
+
+def advance_state(state: State, closes: np.ndarray) -> tuple[dict[str, np.ndarray], State]:
+    """Run closes through the indicator kernel starting from state
+
+    Returns the indicator arrays for closes and the state after all but
+    the last close: the newest bar is still forming, so the next update
+    resumes from just before it. The state passed in is left untouched.
+    """
+    scalars, ring = state[0].copy(), state[1].copy()
+    # Calculate indicators in single precision: the signal thresholds
+    # (30/70 RSI, band breaches, crossovers, 0.6/0.8 strengths) don't move
+    # at float32 resolution
+    closes = np.ascontiguousarray(closes, dtype=np.float32)
+    out = np.empty((len(INDICATORS), len(closes)), np.float32)
+    _compute_all(closes[:-1], scalars, ring, *out[:, :-1])
+    committed = (scalars.copy(), ring.copy())
+    _compute_all(closes[-1:], scalars, ring, *out[:, -1:])
+    indicators = dict(zip(INDICATORS, out))
+    indicators['sma_20'] = indicators['bb_middle']
+    return indicators, committed